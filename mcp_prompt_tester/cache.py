@@ -0,0 +1,119 @@
+"""Persistent on-disk cache for LLM responses."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+
+# Default cache database location, used when PROMPT_TESTER_CACHE_PATH is not set
+_DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "llm_cache.db")
+
+# Entries older than this many seconds are treated as misses and deleted on the next store
+CACHE_TTL = 7 * 24 * 60 * 60
+
+# The cache table is created once, when the first connection is opened
+_CACHE_READY = False
+_INIT_LOCK = threading.Lock()
+
+# Thread-local storage for SQLite connections
+_local = threading.local()
+
+
+def get_cache_path() -> str:
+    """
+    Get the cache database location.
+
+    Read on use rather than at import, so a value loaded from a .env file at server startup
+    is honored.
+    """
+    cache_path = os.environ.get("PROMPT_TESTER_CACHE_PATH")
+    if not cache_path:
+        return _DEFAULT_CACHE_PATH
+    return os.path.abspath(os.path.expanduser(cache_path))
+
+
+def _open() -> sqlite3.Connection:
+    """Open a connection to the cache database."""
+    cache_path = get_cache_path()
+    # Ensure the directory exists
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    conn = sqlite3.connect(cache_path)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    # Wait for a concurrent writer instead of failing with "database is locked"
+    conn.execute("PRAGMA busy_timeout = 5000")
+    return conn
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Get a thread-local connection to the cache database, initializing it on first use."""
+    global _CACHE_READY
+    if not hasattr(_local, "conn"):
+        if not _CACHE_READY:
+            with _INIT_LOCK:
+                if not _CACHE_READY:
+                    init_cache()
+                    _CACHE_READY = True
+        _local.conn = _open()
+    return _local.conn
+
+
+def init_cache() -> None:
+    """Initialize the cache database with the necessary table."""
+    conn = _open()
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key BLOB PRIMARY KEY,
+        created INTEGER NOT NULL,
+        payload BLOB NOT NULL
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created)")
+    conn.commit()
+    conn.close()
+
+
+def make_cache_key(config: Dict[str, Any]) -> bytes:
+    """
+    Build a cache key for a request configuration.
+
+    The configuration is serialized with sorted keys so that logically identical
+    configurations map to the same key regardless of argument order.
+    """
+    return hashlib.blake2b(orjson.dumps(config, option=orjson.OPT_SORT_KEYS)).digest()
+
+
+def get_cached(key: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached result.
+
+    Returns:
+        The cached result, or None if there is no fresh entry for the key
+    """
+    row = _get_connection().execute(
+        "SELECT payload FROM llm_cache WHERE key = ? AND created >= ?",
+        (key, int(time.time()) - CACHE_TTL)
+    ).fetchone()
+    return orjson.loads(row[0]) if row else None
+
+
+def set_cached(key: bytes, result: Dict[str, Any]) -> None:
+    """
+    Store a result in the cache, replacing any previous entry for the key.
+
+    Expired entries are deleted in the same transaction, so the file does not keep growing
+    with responses that can no longer be returned.
+    """
+    now = int(time.time())
+    conn = _get_connection()
+    conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - CACHE_TTL,))
+    conn.execute(
+        "INSERT OR REPLACE INTO llm_cache (key, created, payload) VALUES (?, ?, ?)",
+        (key, now, orjson.dumps(result))
+    )
+    conn.commit()
+
@@ -0,0 +1,165 @@
+"""Single-threaded writer for a SQLite database."""
+
+import asyncio
+import queue
+import sqlite3
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+# A unit of work: the function to run against the writer's cursor, its arguments, and the
+# future (with its event loop) that receives the result
+_WorkItem = Tuple[Callable[..., Any], tuple, asyncio.Future, asyncio.AbstractEventLoop]
+
+# Upper bound on the number of work items committed together
+_MAX_BATCH = 64
+
+
+def _resolve(future: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    """Complete a future on its event loop, unless the caller has already given up on it."""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class DBWriter:
+    """
+    Runs all writes to a database on one dedicated thread.
+
+    Callers submit functions that receive a cursor on the writer's connection. Work items
+    that are already queued when the writer picks up the next one are committed together in
+    a single transaction, each inside its own savepoint, so under load many small writes
+    share one commit while a failing item only rolls back its own changes.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]):
+        """
+        Args:
+            connect: Function that opens a connection to the database
+        """
+        self._connect = connect
+        self._queue: "queue.Queue[Optional[_WorkItem]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    async def submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run `fn(cursor, *args)` on the writer thread and commit its changes.
+
+        Returns:
+            The value returned by `fn`
+
+        Raises:
+            Whatever `fn` or the commit raised; the item's changes are rolled back. If the
+            database cannot be opened, the error from opening it.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Starting the thread and queueing happen under one lock, so an item is never queued
+        # for a writer that has already given up (see _fail_pending)
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                thread.start()
+                self._thread = thread
+            self._queue.put((fn, args, future, loop))
+        return await future
+
+    def close(self) -> None:
+        """Finish queued work and stop the writer thread."""
+        with self._start_lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(None)
+            self._thread = None
+        thread.join()
+
+    def _fail_pending(self, error: BaseException) -> None:
+        """
+        Stop the writer after it failed to start, failing every queued item with `error`.
+
+        The next submit starts a new writer, which retries opening the database.
+        """
+        with self._start_lock:
+            self._thread = None
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    return
+                if item is not None:
+                    _, _, future, loop = item
+                    self._deliver(future, loop, None, error)
+
+    @staticmethod
+    def _deliver(future: asyncio.Future, loop: asyncio.AbstractEventLoop, result: Any, error: Optional[BaseException]) -> None:
+        """Hand a work item's outcome back to its event loop."""
+        try:
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+        except RuntimeError:
+            # The caller's event loop has been closed
+            pass
+
+    def _run(self) -> None:
+        """Writer thread main loop."""
+        try:
+            conn = self._connect()
+        except Exception as e:
+            self._fail_pending(e)
+            return
+        # Transactions are managed explicitly below
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+
+                # Take whatever else is already waiting, without delaying the first item
+                batch = [item]
+                stop = False
+                while len(batch) < _MAX_BATCH:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+
+                self._run_batch(conn, cursor, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _run_batch(conn: sqlite3.Connection, cursor: sqlite3.Cursor, batch: List[_WorkItem]) -> None:
+        """Run a batch of work items in one transaction and deliver their results."""
+        outcomes: List[Tuple[Any, Optional[BaseException]]] = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for fn, args, _, _ in batch:
+                cursor.execute("SAVEPOINT work_item")
+                try:
+                    result = fn(cursor, *args)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO work_item")
+                    outcomes.append((None, e))
+                else:
+                    outcomes.append((result, None))
+                cursor.execute("RELEASE work_item")
+            cursor.execute("COMMIT")
+        except Exception as e:
+            # The transaction itself failed, so none of the batch was written
+            if conn.in_transaction:
+                conn.rollback()
+            outcomes = [(None, e)] * len(batch)
+
+        for (_, _, future, loop), (result, error) in zip(batch, outcomes):
+            DBWriter._deliver(future, loop, result, error)
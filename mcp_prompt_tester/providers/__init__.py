@@ -1,5 +1,7 @@
 """LLM providers for MCP Prompt Tester."""
 
+from typing import Dict
+
 from .base import ProviderBase, ProviderError
 from .openai import OpenAIProvider
 from .anthropic import AnthropicProvider
@@ -10,4 +12,32 @@ PROVIDERS = {
     "anthropic": AnthropicProvider,
 }
 
-__all__ = ["ProviderBase", "ProviderError", "OpenAIProvider", "AnthropicProvider", "PROVIDERS"] 
\ No newline at end of file
+# Default models per provider; the tables are static, so they are built once and shared
+DEFAULT_MODELS = {name: provider_class.get_default_models() for name, provider_class in PROVIDERS.items()}
+
+
+def refresh_default_models() -> None:
+    """Rebuild DEFAULT_MODELS in place (e.g. after PROVIDERS has been modified)."""
+    DEFAULT_MODELS.clear()
+    DEFAULT_MODELS.update(
+        {name: provider_class.get_default_models() for name, provider_class in PROVIDERS.items()}
+    )
+
+
+# Provider instances (and their HTTP connection pools) are reused across requests
+_INSTANCES: Dict[str, ProviderBase] = {}
+
+
+def get_provider(provider_name: str) -> ProviderBase:
+    """Get the shared instance for a provider, constructing it on first use."""
+    provider_instance = _INSTANCES.get(provider_name)
+    if provider_instance is None:
+        provider_instance = PROVIDERS[provider_name]()
+        _INSTANCES[provider_name] = provider_instance
+    return provider_instance
+
+
+__all__ = [
+    "ProviderBase", "ProviderError", "OpenAIProvider", "AnthropicProvider", "PROVIDERS",
+    "DEFAULT_MODELS", "refresh_default_models", "get_provider",
+] 
\ No newline at end of file
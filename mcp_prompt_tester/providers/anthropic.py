@@ -4,7 +4,7 @@ import time
 from typing import Dict, Any, Optional, List
 
 from langfuse.decorators import observe
-from anthropic import Anthropic, APIConnectionError, APIError, RateLimitError
+from anthropic import AsyncAnthropic, APIConnectionError, APIError, RateLimitError
 
 from .base import ProviderBase, ProviderError
 from ..env import get_api_key
@@ -18,7 +18,7 @@ class AnthropicProvider(ProviderBase):
         try:
             # Get API key using the utility function
             api_key = get_api_key("anthropic")
-            self.client = Anthropic(api_key=api_key)
+            self.client = AsyncAnthropic(api_key=api_key)
         except ValueError as e:
             raise ProviderError(str(e))
 
@@ -57,7 +57,7 @@ class AnthropicProvider(ProviderBase):
             
             # Make the API call
             start_time = time.time()
-            response = self.client.messages.create(**request_params)
+            response = await self.client.messages.create(**request_params)
             end_time = time.time()
             response_time = end_time - start_time
             
@@ -181,7 +181,7 @@ class AnthropicProvider(ProviderBase):
             start_time = time.time()
             
             # Make the API call
-            response = self.client.messages.create(**request_params)
+            response = await self.client.messages.create(**request_params)
             
             # Calculate the response time
             response_time = time.time() - start_time
@@ -4,7 +4,7 @@ import time
 from typing import Dict, Any, Optional, List
 
 from langfuse.decorators import observe
-from openai import OpenAI, APIError, APIConnectionError, RateLimitError
+from openai import AsyncOpenAI, APIError, APIConnectionError, RateLimitError
 
 from .base import ProviderBase, ProviderError
 from ..env import get_api_key
@@ -18,7 +18,7 @@ class OpenAIProvider(ProviderBase):
         try:
             # Get API key using the utility function
             api_key = get_api_key("openai")
-            self.client = OpenAI(api_key=api_key)
+            self.client = AsyncOpenAI(api_key=api_key)
         except ValueError as e:
             raise ProviderError(str(e))
 
@@ -57,7 +57,7 @@ class OpenAIProvider(ProviderBase):
             
             # Make the API call
             start_time = time.time()
-            response = self.client.chat.completions.create(**request_params)
+            response = await self.client.chat.completions.create(**request_params)
             end_time = time.time()
             response_time = end_time - start_time
             
@@ -150,7 +150,7 @@ class OpenAIProvider(ProviderBase):
             start_time = time.time()
             
             # Make the API call
-            response = self.client.chat.completions.create(**request_params)
+            response = await self.client.chat.completions.create(**request_params)
             
             # Calculate the response time
             response_time = time.time() - start_time
@@ -2,7 +2,7 @@
 
 import anyio
 import click
-import json
+import orjson
 import mcp.types as types
 from mcp.server.lowlevel import Server #, NotificationOptions
 # from typing import Dict, List, Any, Optional
@@ -53,13 +53,13 @@ def create_server() -> Server:
             else:
                 return [types.TextContent(
                     type="text",
-                    text=json.dumps({"isError": True, "error": f"Unknown tool: {name}"})
+                    text=orjson.dumps({"isError": True, "error": f"Unknown tool: {name}"}).decode()
                 )]
                 
         except Exception as e:
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"isError": True, "error": f"Unexpected error: {str(e)}"})
+                text=orjson.dumps({"isError": True, "error": f"Unexpected error: {str(e)}"}).decode()
             )]
 
     @app.list_tools()
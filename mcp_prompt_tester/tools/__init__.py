@@ -50,6 +50,10 @@ def get_tool_definitions() -> list[Dict[str, Any]]:
                         },
                         "minItems": 1,
                         "maxItems": 4
+                    },
+                    "use_cache": {
+                        "type": "boolean",
+                        "description": "Reuse stored results for identical configurations instead of generating again (default: false)."
                     }
                 },
                 "required": ["comparisons"]
@@ -63,8 +67,8 @@ def get_tool_definitions() -> list[Dict[str, Any]]:
                 "properties": {
                     "mode": {
                         "type": "string",
-                        "description": "Operation mode: 'start', 'continue', 'get', 'list', or 'close'",
-                        "enum": ["start", "continue", "get", "list", "close"]
+                        "description": "Operation mode: 'start', 'continue', 'continue_many', 'get', 'list', or 'close'",
+                        "enum": ["start", "continue", "continue_many", "get", "list", "close"]
                     },
                     "conversation_id": {
                         "type": "string",
@@ -86,6 +90,25 @@ def get_tool_definitions() -> list[Dict[str, Any]]:
                         "type": "string",
                         "description": "The user message (used in start and continue modes)"
                     },
+                    "continuations": {
+                        "type": "array",
+                        "description": "Conversations to continue concurrently (required for continue_many mode only)",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "conversation_id": {"type": "string", "description": "The conversation to continue."},
+                                "user_prompt": {"type": "string", "description": "The user message."}
+                            },
+                            "required": ["conversation_id"]
+                        },
+                        "minItems": 1,
+                        "maxItems": 4
+                    },
+                    "max_history": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum number of history messages sent to the model, including the new one (continue and continue_many modes, default: 40)"
+                    },
                     "temperature": {
                         "type": "number",
                         "description": "Temperature parameter for the model (start mode only)"
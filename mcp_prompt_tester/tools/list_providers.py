@@ -1,9 +1,9 @@
 """Tool for listing available providers and their default models."""
 
-import json
+import orjson
 from mcp import types
 
-from ..providers import PROVIDERS
+from ..providers import PROVIDERS, DEFAULT_MODELS
 from ..env import get_api_key
 
 
@@ -11,13 +11,14 @@ async def list_providers() -> types.TextContent:
     """List available providers and their default models."""
     result = {}
     
-    for provider_name, provider_class in PROVIDERS.items():
+    # Every step below is an in-memory lookup, so a plain loop is as fast as any fan-out
+    for provider_name in PROVIDERS:
         # Skip providers without API keys
         if not get_api_key(provider_name, raise_error=False):
             continue
             
-        # Get default models
-        default_models = provider_class.get_default_models()
+        # Get default models from the shared table
+        default_models = DEFAULT_MODELS.get(provider_name, {})
         
         # Format for output
         models_list = [
@@ -35,5 +36,5 @@ async def list_providers() -> types.TextContent:
     
     return types.TextContent(
         type="text",
-        text=json.dumps({"providers": result})
+        text=orjson.dumps({"providers": result}).decode()
     ) 
\ No newline at end of file
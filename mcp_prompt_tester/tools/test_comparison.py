@@ -1,12 +1,66 @@
 """Tool for comparing multiple prompts across different providers and models."""
 
-import json
 import asyncio
+import logging
+import orjson
+from typing import Optional
 from mcp import types
 from langfuse.decorators import observe
 
-from ..providers import PROVIDERS, ProviderError
+from ..providers import PROVIDERS, DEFAULT_MODELS, ProviderError, get_provider
 from ..env import get_api_key
+from ..cache import make_cache_key, get_cached, set_cached
+
+logger = logging.getLogger(__name__)
+
+# Configuration keys consumed directly; anything else is forwarded to the provider
+_CONFIG_KEYS = frozenset({"provider", "model", "system_prompt", "user_prompt", "temperature", "max_tokens", "top_p"})
+
+# Provider result keys promoted to the top level; the rest is returned as metadata
+_RESULT_TOP = frozenset({"text", "model", "usage", "costs", "response_time"})
+
+# Upper bound on exception text echoed back to the client; full details go to the log
+_MAX_ERROR_CHARS = 256
+
+# Fixed validation errors are serialized once at import rather than per request
+_ERR_EMPTY_COMPARISONS = types.TextContent(
+    type="text",
+    text=orjson.dumps({"isError": True, "error": "The 'comparisons' argument must be a non-empty list."}).decode()
+)
+_ERR_COMPARISON_COUNT = types.TextContent(
+    type="text",
+    text=orjson.dumps({"isError": True, "error": "You can compare between 1 and 4 configurations."}).decode()
+)
+
+
+def _cache_key(config: dict) -> Optional[bytes]:
+    """Build the cache key for a configuration, or None (no caching) if it cannot be encoded."""
+    try:
+        return make_cache_key(config)
+    except Exception:
+        logger.exception("Cache key could not be built")
+        return None
+
+
+async def _cache_lookup(cache_key: bytes) -> Optional[dict]:
+    """
+    Look up a cached result off the event loop.
+
+    The cache is best-effort: errors are logged and treated as a miss.
+    """
+    try:
+        return await asyncio.to_thread(get_cached, cache_key)
+    except Exception:
+        logger.exception("Cache lookup failed")
+        return None
+
+
+async def _cache_store(cache_key: bytes, result: dict) -> None:
+    """Store a result in the cache off the event loop, logging (not raising) any error."""
+    try:
+        await asyncio.to_thread(set_cached, cache_key, result)
+    except Exception:
+        logger.exception("Cache store failed")
 
 
 @observe()
@@ -18,16 +72,14 @@ async def test_comparison(arguments: dict) -> types.TextContent:
         # 1. Input Validation and Configuration
         comparisons = arguments.get("comparisons")
         if not comparisons or not isinstance(comparisons, list):
-            return types.TextContent(
-                type="text",
-                text=json.dumps({"isError": True, "error": "The 'comparisons' argument must be a non-empty list."})
-            )
+            return _ERR_EMPTY_COMPARISONS
 
         if not 1 <= len(comparisons) <= 4:
-            return types.TextContent(
-                type="text",
-                text=json.dumps({"isError": True, "error": "You can compare between 1 and 4 configurations."})
-            )
+            return _ERR_COMPARISON_COUNT
+
+        # Reuse results from earlier identical runs only when asked: repeating a run is how
+        # sampling variation is observed
+        use_cache = arguments.get("use_cache", False)
 
         # 2. Prepare and Execute Comparison Runs (Asynchronously)
         async def run_comparison(config: dict) -> dict:
@@ -41,9 +93,7 @@ async def test_comparison(arguments: dict) -> types.TextContent:
             top_p = config.get("top_p")
             
             # Additional kwargs from any remaining arguments
-            kwargs = {k: v for k, v in config.items() 
-                    if k not in ["provider", "model", "system_prompt", "user_prompt", 
-                               "temperature", "max_tokens", "top_p"]}
+            kwargs = {k: v for k, v in config.items() if k not in _CONFIG_KEYS}
 
             # Check required parameters - allow empty string for user_prompt
             if provider_name is None or model is None or system_prompt is None or user_prompt is None:
@@ -59,17 +109,22 @@ async def test_comparison(arguments: dict) -> types.TextContent:
             if not api_key:
                 return {"isError": True, "error": f"API key for provider '{provider_name}' is not available. Please set {provider_name.upper()}_API_KEY in your environment or .env file."}
 
+            cache_key = _cache_key(config) if use_cache else None
+            if cache_key is not None:
+                cached = await _cache_lookup(cache_key)
+                if cached is not None:
+                    cached["cached"] = True
+                    return cached
+
             try:
-                provider_class = PROVIDERS[provider_name]
-                provider_instance = provider_class()
+                provider_instance = get_provider(provider_name)
                 
                 # Validate if model exists for this provider
-                default_models = provider_class.get_default_models()
+                default_models = DEFAULT_MODELS.get(provider_name, {})
                 
                 # Check if model exists in default models, but don't block if it doesn't
                 # This allows testing custom or new models not in the default list
-                model_exists = any(model_info["name"] == model for model_info in 
-                                 [model_data for model_type, model_data in default_models.items()])
+                model_exists = any(model_info["name"] == model for model_info in default_models.values())
                 
                 if not model_exists:
                     # Just log a warning, but continue anyway - the model might be valid
@@ -86,7 +141,7 @@ async def test_comparison(arguments: dict) -> types.TextContent:
                     **kwargs
                 )
                 
-                return {
+                response = {
                     "isError": False,
                     "response": result["text"],
                     "model": result["model"],
@@ -94,31 +149,39 @@ async def test_comparison(arguments: dict) -> types.TextContent:
                     "usage": result.get("usage", {}),
                     "costs": result.get("costs", {}),
                     "response_time": result.get("response_time", 0),
-                    "metadata": {
-                        k: v for k, v in result.items()
-                        if k not in ["text", "model", "usage", "costs", "response_time"]
-                    }
+                    "metadata": {k: v for k, v in result.items() if k not in _RESULT_TOP}
                 }
             except ProviderError as e:
                 # This will catch errors if the model doesn't exist or other provider-specific errors
-                return {"isError": True, "error": f"Provider error: {str(e)}"}
+                logger.exception("Provider error for %s/%s", provider_name, model)
+                return {"isError": True, "error": f"Provider error: {str(e)[:_MAX_ERROR_CHARS]}"}
             except Exception as e:
-                return {"isError": True, "error": f"Unexpected error: {str(e)}"}
+                logger.exception("Unexpected error for %s/%s", provider_name, model)
+                return {"isError": True, "error": f"Unexpected error: {type(e).__name__}: {str(e)[:_MAX_ERROR_CHARS]}"}
+
+            # Stored outside the provider error handling: a failed cache write must not
+            # discard a generation that already succeeded
+            if cache_key is not None:
+                await _cache_store(cache_key, response)
+
+            return response
 
         # Use asyncio.gather to run all comparisons concurrently
         results = await asyncio.gather(*(run_comparison(config) for config in comparisons))
 
         # 3. Aggregate and Return Results
+        # orjson emits compact JSON, which keeps large multi-response payloads small on the wire
         return types.TextContent(
             type="text",
-            text=json.dumps({
+            text=orjson.dumps({
                 "isError": False,
                 "results": results  # A list of results, one for each comparison
-            })
+            }).decode()
         )
 
     except Exception as e:
+        logger.exception("Unexpected error in test_comparison")
         return types.TextContent(
             type="text",
-            text=json.dumps({"isError": True, "error": f"Unexpected error: {str(e)}"})
+            text=orjson.dumps({"isError": True, "error": f"Unexpected error: {type(e).__name__}: {str(e)[:_MAX_ERROR_CHARS]}"}).decode()
         ) 
\ No newline at end of file
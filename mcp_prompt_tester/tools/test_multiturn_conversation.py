@@ -1,44 +1,223 @@
 """Tool for managing multi-turn conversations with various LLM providers."""
 
-import json
+import atexit
 import uuid
+import functools
+import asyncio
+import concurrent.futures
+import logging
+import orjson
 import sqlite3
 import os
 import threading
-from typing import Dict, Any
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from mcp import types
 from langfuse.decorators import observe
 
-from ..providers import PROVIDERS, ProviderError
+from ..providers import PROVIDERS, ProviderError, get_provider
 from ..env import get_api_key
+from ..db_writer import DBWriter
 
-# Database file location
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "conversations.db")
+logger = logging.getLogger(__name__)
+
+# Default database file location, used when PROMPT_TESTER_DB_PATH is not set
+_DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "conversations.db"
+)
+
+# Default retention limits: conversations idle for longer than the TTL (in seconds) are
+# expired, and only the most recently active _MAX_CONVERSATIONS are kept
+_MAX_CONVERSATIONS = 1024
+_CONVERSATION_TTL = 24 * 60 * 60
+
+# Maximum number of conversations continued by one continue_many request, matching the number
+# of configurations test_comparison runs at once
+_MAX_CONTINUATIONS = 4
+
+# Maximum number of history messages (including the new user message) sent to the provider
+# on continuation; the oldest turns beyond this window are dropped from the request
+_MAX_HISTORY_MESSAGES = 40
+
+# The schema is initialized once, when the first connection is opened
+_DB_READY = False
+_INIT_LOCK = threading.Lock()
 
 # Thread-local storage for SQLite connections
 local = threading.local()
 
+# Every read connection opened on a pool thread, so they can be closed at exit
+_READ_CONNECTIONS: List[sqlite3.Connection] = []
+_READ_CONNECTIONS_LOCK = threading.Lock()
+
+# Tool arguments consumed by this module; anything else is forwarded to the provider
+_RESERVED_ARGUMENTS = frozenset({
+    "mode", "provider", "model", "system_prompt", "user_prompt",
+    "temperature", "max_tokens", "top_p", "conversation_id", "continuations", "max_history",
+})
+
+# Per-conversation locks serializing continuation turns within this process (other processes
+# sharing the database are not covered); entries disappear once unused
+_CONVERSATION_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# Blocking database reads run on this pool so they never stall the event loop; each worker
+# thread keeps its own connection
+_DB_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="db-read")
+
+# API key availability per provider; keys are read from the environment once at startup
+_API_KEY_OK: Dict[str, bool] = {}
+
+
+def _provider_ready(provider_name: str) -> Optional[str]:
+    """Check that a provider can be used, returning an error message if it cannot."""
+    if provider_name not in PROVIDERS:
+        return f"Provider '{provider_name}' not supported."
+
+    ok = _API_KEY_OK.get(provider_name)
+    if ok is None:
+        ok = _API_KEY_OK[provider_name] = bool(get_api_key(provider_name, raise_error=False))
+    if not ok:
+        return f"API key for provider '{provider_name}' is not available."
+    return None
+
+
+async def _adb(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking database function on the read pool."""
+    return await asyncio.get_running_loop().run_in_executor(_DB_POOL, fn, *args)
+
+
+def _uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered (version 7) UUID: a 48-bit millisecond timestamp followed by
+    random bits.
+
+    IDs created later sort later, so new conversations are appended at the end of the
+    primary key index instead of landing on a random page.
+    """
+    value = (time.time_ns() // 1_000_000 & 0xFFFF_FFFF_FFFF) << 80 | int.from_bytes(os.urandom(10), "big")
+    # Set the version (7) and the RFC 4122 variant bits
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+def _tc(payload: dict) -> types.TextContent:
+    """Serialize a response payload into a TextContent."""
+    return types.TextContent(type="text", text=orjson.dumps(payload).decode())
+
+
+def _tc_raw(payload: dict, raw: Dict[str, str]) -> types.TextContent:
+    """
+    Serialize a response payload, appending fields whose values are already JSON text.
+
+    Pre-encoded values (e.g. JSON built by SQLite or stored in the database) are spliced in
+    as-is instead of being decoded into Python objects and encoded again.
+    """
+    parts = [orjson.dumps(payload).decode()[:-1]]
+    for key, value in raw.items():
+        parts.append(f',"{key}":{value}')
+    parts.append("}")
+    return types.TextContent(type="text", text="".join(parts))
+
+
+def _error(message: str) -> types.TextContent:
+    """Build an error response, encoding only the (dynamic) message string."""
+    return types.TextContent(type="text", text='{"isError":true,"error":' + orjson.dumps(message).decode() + '}')
+
+
+def _json_errors(handler: Callable[[dict], Awaitable[types.TextContent]]) -> Callable[[dict], Awaitable[types.TextContent]]:
+    """Wrap a mode handler so that any exception it raises becomes a JSON error response."""
+    @functools.wraps(handler)
+    async def wrapper(arguments: dict) -> types.TextContent:
+        try:
+            return await handler(arguments)
+        except ProviderError as e:
+            return _error(f"Provider error: {str(e)}")
+        except Exception as e:
+            return _error(f"Unexpected error: {str(e)}")
+    return wrapper
+
+
+# Fixed error responses are serialized once at import rather than per request
+_ERR_MISSING_MODE = _error("Missing required parameter 'mode'.")
+_ERR_INVALID_MODE = _error("Invalid mode. Must be 'start', 'continue', 'continue_many', 'get', 'list', or 'close'.")
+_ERR_INVALID_CONTINUATIONS = _error(
+    "The 'continuations' parameter must be a list of objects, each with a 'conversation_id'."
+)
+_ERR_INVALID_MAX_HISTORY = _error("The 'max_history' parameter must be a positive integer.")
+_ERR_TOO_MANY_CONTINUATIONS = _error(f"You can continue between 1 and {_MAX_CONTINUATIONS} conversations at once.")
+
+def get_db_path() -> str:
+    """
+    Get the conversation database location.
+
+    Read on use rather than at import, so a value loaded from a .env file at server startup
+    is honored.
+    """
+    db_path = os.environ.get("PROMPT_TESTER_DB_PATH")
+    if not db_path:
+        return _DEFAULT_DB_PATH
+    # A bare file name or ~ path is resolved here, so the directory part is never empty
+    return os.path.abspath(os.path.expanduser(db_path))
+
+def _open() -> sqlite3.Connection:
+    """Open a tuned connection to the conversation database."""
+    db_path = get_db_path()
+    # Ensure the directory exists
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+    # Connection-level tuning: with WAL (set once in init_db) a commit only needs to sync
+    # at checkpoints, and a busy timeout lets concurrent writers wait instead of failing
+    conn.executescript(
+        "PRAGMA synchronous = NORMAL;"
+        "PRAGMA temp_store = MEMORY;"
+        "PRAGMA mmap_size = 268435456;"
+        "PRAGMA cache_size = -65536;"
+        "PRAGMA busy_timeout = 5000;"
+    )
+    # Return dict-like rows
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _connect() -> sqlite3.Connection:
+    """Open a connection to the conversation database, initializing the schema on first use."""
+    global _DB_READY
+    if not _DB_READY:
+        with _INIT_LOCK:
+            if not _DB_READY:
+                init_db()
+                _DB_READY = True
+    return _open()
+
 def get_db_connection():
-    """Get a thread-local database connection."""
+    """Get a thread-local database connection, used for reads."""
     if not hasattr(local, "conn"):
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-        local.conn = sqlite3.connect(DB_PATH)
-        # Enable foreign keys and return dict-like rows
-        local.conn.execute("PRAGMA foreign_keys = ON")
-        local.conn.row_factory = sqlite3.Row
+        # The connection stays open for the life of the thread and is reused across requests
+        local.conn = _connect()
+        with _READ_CONNECTIONS_LOCK:
+            _READ_CONNECTIONS.append(local.conn)
     return local.conn
 
-def close_db_connection():
-    """Close the thread-local database connection."""
-    if hasattr(local, "conn"):
-        local.conn.close()
-        del local.conn
+def _close_read_connections() -> None:
+    """Stop the read pool and close the connections its threads opened."""
+    _DB_POOL.shutdown(wait=True)
+    # The pool threads are gone, so their connections can be closed from this thread
+    with _READ_CONNECTIONS_LOCK:
+        for conn in _READ_CONNECTIONS:
+            conn.close()
+        _READ_CONNECTIONS.clear()
 
 def init_db():
     """Initialize the database with necessary tables."""
-    conn = get_db_connection()
+    conn = _open()
     cursor = conn.cursor()
+
+    # WAL lets readers proceed while a write commits; the mode is persistent in the file
+    cursor.execute("PRAGMA journal_mode = WAL")
+
+    # The whole schema bootstrap (and any migration) is applied in one transaction
+    cursor.execute("BEGIN IMMEDIATE")
     
     # Create conversations table
     cursor.execute('''
@@ -50,26 +229,137 @@ def init_db():
         hyperparameters TEXT NOT NULL,
         usage TEXT,
         costs TEXT,
-        response_time REAL DEFAULT 0
-    )
-    ''')
-    
-    # Create conversation_history table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS conversation_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        conversation_id TEXT NOT NULL,
-        role TEXT NOT NULL,
-        content TEXT NOT NULL,
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
+        response_time REAL DEFAULT 0,
+        last_active INTEGER NOT NULL DEFAULT 0,
+        first_user_message TEXT NOT NULL DEFAULT '',
+        latest_assistant_message TEXT NOT NULL DEFAULT '',
+        message_count INTEGER NOT NULL DEFAULT 0,
+        system_prompt_summary TEXT NOT NULL DEFAULT '',
+        history TEXT NOT NULL DEFAULT '[]'
     )
     ''')
+
+    # Add columns introduced after the original schema to existing databases
+    columns = {row["name"] for row in cursor.execute("PRAGMA table_info(conversations)")}
+    if "last_active" not in columns:
+        cursor.execute("ALTER TABLE conversations ADD COLUMN last_active INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("UPDATE conversations SET last_active = ?", (int(time.time()),))
+    if "message_count" not in columns:
+        # Summary fields are maintained on write; compute them once for existing conversations,
+        # in a single aggregate pass over the history rather than three subqueries per conversation
+        cursor.execute("ALTER TABLE conversations ADD COLUMN first_user_message TEXT NOT NULL DEFAULT ''")
+        cursor.execute("ALTER TABLE conversations ADD COLUMN latest_assistant_message TEXT NOT NULL DEFAULT ''")
+        cursor.execute("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+        cursor.execute('''
+        UPDATE conversations SET
+            first_user_message = COALESCE(first_user.content, ''),
+            latest_assistant_message = COALESCE(latest_assistant.content, ''),
+            message_count = summary.message_count
+        FROM (
+            SELECT conversation_id,
+                   MIN(id) FILTER (WHERE role = 'user') AS first_user_id,
+                   MAX(id) FILTER (WHERE role = 'assistant') AS latest_assistant_id,
+                   COUNT(*) AS message_count
+            FROM conversation_history
+            GROUP BY conversation_id
+        ) AS summary
+        LEFT JOIN conversation_history AS first_user ON first_user.id = summary.first_user_id
+        LEFT JOIN conversation_history AS latest_assistant ON latest_assistant.id = summary.latest_assistant_id
+        WHERE summary.conversation_id = conversations.id
+        ''')
+    if "system_prompt_summary" not in columns:
+        cursor.execute("ALTER TABLE conversations ADD COLUMN system_prompt_summary TEXT NOT NULL DEFAULT ''")
+        cursor.execute(
+            "UPDATE conversations SET system_prompt_summary = CASE WHEN length(system_prompt) > 100 "
+            "THEN substr(system_prompt, 1, 100) || '...' ELSE system_prompt END"
+        )
+    if "history" not in columns:
+        # History used to be stored one row per message in a separate table; move it into
+        # the conversation rows (the old table always exists alongside this older schema)
+        cursor.execute("ALTER TABLE conversations ADD COLUMN history TEXT NOT NULL DEFAULT '[]'")
+        cursor.execute(
+            "UPDATE conversations SET history = (SELECT json_group_array(json_object('role', role, 'content', content)) "
+            "FROM (SELECT role, content FROM conversation_history WHERE conversation_id = conversations.id ORDER BY id))"
+        )
+        cursor.execute("DROP TABLE conversation_history")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_last_active ON conversations(last_active)")
     
     conn.commit()
+    conn.close()
+
+def _retention_limit(env_var_name: str, default: int) -> int:
+    """
+    Read a retention limit from the environment, where 0 means unlimited.
 
-# Initialize the database on module load
-init_db()
+    Read on use, like the database path, so a value set in a .env file is honored.
+    """
+    value = os.environ.get(env_var_name)
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        logger.warning(f"Ignoring invalid {env_var_name} value {value!r}; using {default}")
+        return default
+    return limit
+
+def _expiry_cutoff() -> int:
+    """Get the last_active time below which conversations are expired (0 if they never expire)."""
+    ttl = _retention_limit("PROMPT_TESTER_CONVERSATION_TTL", _CONVERSATION_TTL)
+    return int(time.time()) - ttl if ttl else 0
+
+def _prune_conversations(cursor: sqlite3.Cursor) -> None:
+    """Delete expired conversations and make room for one more within the conversation limit."""
+    cutoff = _expiry_cutoff()
+    if cutoff:
+        cursor.execute("DELETE FROM conversations WHERE last_active < ?", (cutoff,))
+    max_conversations = _retention_limit("PROMPT_TESTER_MAX_CONVERSATIONS", _MAX_CONVERSATIONS)
+    if max_conversations:
+        cursor.execute(
+            "DELETE FROM conversations WHERE id IN "
+            "(SELECT id FROM conversations ORDER BY last_active DESC LIMIT -1 OFFSET ?)",
+            (max_conversations - 1,)
+        )
+
+def _insert_conversation(cursor: sqlite3.Cursor, row: tuple, user_prompt: str, response: str) -> None:
+    """Write a new conversation and its first turn, making room for it within the retention limits."""
+    _prune_conversations(cursor)
+    cursor.execute(
+        "INSERT INTO conversations (id, provider, model, system_prompt, hyperparameters, usage, costs, response_time, last_active, first_user_message, latest_assistant_message, message_count, system_prompt_summary, history) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 2, ?, "
+        "json_array(json_object('role', 'user', 'content', ?), json_object('role', 'assistant', 'content', ?)))",
+        row + (user_prompt, response)
+    )
+
+def _record_turn(
+    cursor: sqlite3.Cursor, conversation_id: str, user_prompt: str, response: str,
+    usage_json: str, costs_json: str, response_time: float
+) -> int:
+    """
+    Append a turn to a conversation's history and update its latest usage, costs and summary.
+
+    Returns:
+        The number of conversations updated: 0 if the conversation no longer exists
+    """
+    return cursor.execute(
+        "UPDATE conversations SET history = json_insert(history, "
+        "'$[#]', json_object('role', 'user', 'content', ?), '$[#]', json_object('role', 'assistant', 'content', ?)), "
+        "usage = ?, costs = ?, response_time = ?, last_active = ?, latest_assistant_message = ?, message_count = message_count + 2 WHERE id = ?",
+        (user_prompt, response, usage_json, costs_json, response_time, int(time.time()), response, conversation_id)
+    ).rowcount
+
+def _delete_conversation(cursor: sqlite3.Cursor, conversation_id: str) -> bool:
+    """Delete a conversation (including its history), returning whether it existed."""
+    # fetchall() runs the statement to completion so the batch can be committed
+    return bool(cursor.execute("DELETE FROM conversations WHERE id = ? RETURNING id", (conversation_id,)).fetchall())
+
+atexit.register(_close_read_connections)
+
+# All writes go through one writer thread, so handlers never wait on the database's write
+# lock on the event loop and concurrent writes are committed together
+_WRITER = DBWriter(_connect)
+atexit.register(_WRITER.close)
 
 @observe()
 async def test_multiturn_conversation(arguments: dict) -> types.TextContent:
@@ -79,86 +369,44 @@ async def test_multiturn_conversation(arguments: dict) -> types.TextContent:
     Modes:
         start: Starts a new conversation.
         continue: Continues an existing conversation.
+        continue_many: Continues several conversations concurrently.
         get: Retrieves conversation history.
         list: Lists all active conversations.
         close: Closes a conversation.
     """
-    try:
-        mode = arguments.get("mode")
-
-        if not mode:
-            return types.TextContent(
-                type="text",
-                text=json.dumps({"isError": True, "error": "Missing required parameter 'mode'."})
-            )
-
-        if mode == "start":
-            # Check required parameters for start mode
-            if not arguments.get("provider"):
-                return types.TextContent(type="text", text=json.dumps({"isError": True, "error": "Missing required parameter 'provider' for 'start' mode."}))
-            if not arguments.get("model"):
-                return types.TextContent(type="text", text=json.dumps({"isError": True, "error": "Missing required parameter 'model' for 'start' mode."}))
-            if not arguments.get("system_prompt"):
-                return types.TextContent(type="text", text=json.dumps({"isError": True, "error": "Missing required parameter 'system_prompt' for 'start' mode."}))
-            return await _start_conversation(arguments)
-        elif mode == "continue":
-            # Check required parameters for continue mode
-            if not arguments.get("conversation_id"):
-                return types.TextContent(type="text", text=json.dumps({"isError": True, "error": "Missing required parameter 'conversation_id' for 'continue' mode."}))
-            return await _continue_conversation(arguments)
-        elif mode == "get":
-            # Check required parameters for get mode
-            if not arguments.get("conversation_id"):
-                return types.TextContent(type="text", text=json.dumps({"isError": True, "error": "Missing required parameter 'conversation_id' for 'get' mode."}))
-            return await _get_conversation(arguments)
-        elif mode == "list":
-            return await _list_conversations(arguments)
-        elif mode == "close":
-            # Check required parameters for close mode
-            if not arguments.get("conversation_id"):
-                return types.TextContent(type="text", text=json.dumps({"isError": True, "error": "Missing required parameter 'conversation_id' for 'close' mode."}))
-            return await _close_conversation(arguments)
-        else:
-            return types.TextContent(
-                type="text",
-                text=json.dumps({"isError": True, "error": "Invalid mode. Must be 'start', 'continue', 'get', 'list', or 'close'."})
-            )
+    mode = arguments.get("mode")
 
-    except Exception as e:
-        return types.TextContent(
-            type="text",
-            text=json.dumps({"isError": True, "error": f"Unexpected error: {str(e)}"})
-        )
-    finally:
-        # Close the database connection at the end of the request
-        close_db_connection()
+    if not mode:
+        return _ERR_MISSING_MODE
 
+    entry = _MODES.get(mode)
+    if entry is None:
+        return _ERR_INVALID_MODE
+
+    # Check the required parameters for this mode in a single pass
+    handler, required = entry
+    for param in required:
+        if not arguments.get(param):
+            return _ERR_MISSING_PARAM[mode, param]
+    return await handler(arguments)
+
+@_json_errors
 async def _start_conversation(arguments: dict) -> types.TextContent:
     """Starts a new conversation."""
-    provider_name = arguments.get("provider")
-    model = arguments.get("model")
-    system_prompt = arguments.get("system_prompt")
+    provider_name = arguments["provider"]
+    model = arguments["model"]
+    system_prompt = arguments["system_prompt"]
     user_prompt = arguments.get("user_prompt", "")
     temperature = arguments.get("temperature")
     max_tokens = arguments.get("max_tokens")
     top_p = arguments.get("top_p")
-    kwargs = {k: v for k, v in arguments.items()
-              if k not in ["mode", "provider", "model", "system_prompt", "user_prompt",
-                           "temperature", "max_tokens", "top_p", "conversation_id"]}
-
-    if any(arg is None for arg in [provider_name, model, system_prompt]):
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": "Missing required parameters (provider, model, system_prompt)."}))
-
-    if provider_name not in PROVIDERS:
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": f"Provider '{provider_name}' not supported."}))
+    kwargs = {k: v for k, v in arguments.items() if k not in _RESERVED_ARGUMENTS}
 
-    api_key = get_api_key(provider_name, raise_error=False)
-    if not api_key:
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": f"API key for provider '{provider_name}' is not available."}))
+    not_ready = _provider_ready(provider_name)
+    if not_ready:
+        return _error(not_ready)
 
-    conversation_id = str(uuid.uuid4())
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    conversation_id = _uuid7().hex
     
     # Store hyperparameters as JSON
     hyperparameters = {
@@ -168,121 +416,119 @@ async def _start_conversation(arguments: dict) -> types.TextContent:
         **kwargs
     }
     
-    try:
-        provider_class = PROVIDERS[provider_name]
-        provider_instance = provider_class()
-        
-        # For the first message, we can use the regular generate method
-        result = await provider_instance.generate(
-            model=model,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            top_p=top_p,
-            **kwargs
-        )
-        
-        usage_json = json.dumps(result.get("usage", {}))
-        costs_json = json.dumps(result.get("costs", {}))
-        response_time = result.get("response_time", 0)
-        
-        # Insert data into conversations table
-        cursor.execute(
-            "INSERT INTO conversations (id, provider, model, system_prompt, hyperparameters, usage, costs, response_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (conversation_id, provider_name, model, system_prompt, json.dumps(hyperparameters), usage_json, costs_json, response_time)
-        )
-        
-        # Add the user message to history
-        cursor.execute(
-            "INSERT INTO conversation_history (conversation_id, role, content) VALUES (?, ?, ?)",
-            (conversation_id, "user", user_prompt)
-        )
-        
-        # Add the assistant's response to history
-        cursor.execute(
-            "INSERT INTO conversation_history (conversation_id, role, content) VALUES (?, ?, ?)",
-            (conversation_id, "assistant", result["text"])
-        )
-        
-        conn.commit()
-
-        return types.TextContent(
-            type="text",
-            text=json.dumps({
-                "isError": False,
-                "conversation_id": conversation_id,
-                "response": result["text"],
-                "model": result["model"],
-                "usage": result.get("usage", {}),
-                "costs": result.get("costs", {}),
-                "response_time": response_time
-            })
-        )
+    provider_instance = get_provider(provider_name)
+    
+    # For the first message, we can use the regular generate method
+    result = await provider_instance.generate(
+        model=model,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        top_p=top_p,
+        **kwargs
+    )
+    
+    usage_json = orjson.dumps(result.get("usage", {})).decode()
+    costs_json = orjson.dumps(result.get("costs", {})).decode()
+    response_time = result.get("response_time", 0)
+    
+    # The system prompt never changes, so its list summary is computed once here
+    system_prompt_summary = system_prompt[:100] + "..." if len(system_prompt) > 100 else system_prompt
+    
+    # All writes for the new conversation are committed together; on error nothing is
+    # written and the error response is built by _json_errors
+    await _WRITER.submit(
+        _insert_conversation,
+        (conversation_id, provider_name, model, system_prompt, orjson.dumps(hyperparameters).decode(), usage_json, costs_json, response_time, int(time.time()), user_prompt, result["text"], system_prompt_summary),
+        user_prompt,
+        result["text"]
+    )
 
-    except ProviderError as e:
-        # Rollback on error
-        conn.rollback()
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": f"Provider error: {str(e)}"}))
-    except Exception as e:
-        # Rollback on error
-        conn.rollback()
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": f"Unexpected error during generation: {str(e)}"}))
+    return _tc({
+        "isError": False,
+        "conversation_id": conversation_id,
+        "response": result["text"],
+        "model": result["model"],
+        "usage": result.get("usage", {}),
+        "costs": result.get("costs", {}),
+        "response_time": response_time
+    })
+
+def _conversation_lock(conversation_id: str) -> asyncio.Lock:
+    """Get the lock guarding turns on a conversation, creating it on first use."""
+    lock = _CONVERSATION_LOCKS.get(conversation_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _CONVERSATION_LOCKS[conversation_id] = lock
+    return lock
+
+async def _continue_one(
+    conversation_id: str, user_prompt: str, max_history: int = _MAX_HISTORY_MESSAGES
+) -> Dict[str, Any]:
+    """
+    Continues a single conversation and returns the response payload as a dict.
 
-async def _continue_conversation(arguments: dict) -> types.TextContent:
-    """Continues an existing conversation."""
-    conversation_id = arguments.get("conversation_id")
-    user_prompt = arguments.get("user_prompt", "")
+    Turns on the same conversation are serialized, so each one sees the history written by
+    the previous turn; different conversations still proceed in parallel.
+    """
+    async with _conversation_lock(conversation_id):
+        return await _run_turn(conversation_id, user_prompt, max_history)
 
-    if not conversation_id:
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": "Missing required parameter 'conversation_id'."}))
+def _read_turn_context(conversation_id: str, history_limit: int) -> Optional[sqlite3.Row]:
+    """
+    Load what a turn needs in a single statement: the conversation's settings and, as a JSON
+    array, its most recent `history_limit` history messages in order.
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if conversation exists
-    cursor.execute("SELECT * FROM conversations WHERE id = ?", (conversation_id,))
-    conversation_row = cursor.fetchone()
-    
-    if not conversation_row:
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": f"Conversation with ID '{conversation_id}' not found."}))
+    Only the sampling parameters of the stored hyperparameters are used for a turn, so they
+    are extracted in SQL instead of parsing the whole document. The full history stays in
+    the database; only what is sent to the provider is capped.
 
-    # IMPORTANT: We ignore any system_prompt passed in the continuation request
-    if "system_prompt" in arguments:
-        # Log a warning about ignoring system_prompt in conversation continuation.
-        print(f"Warning: system_prompt parameter ignored in conversation continuation.")
-
-    # Get conversation data
-    provider_name = conversation_row["provider"]
-    model = conversation_row["model"]
-    system_prompt = conversation_row["system_prompt"]
-    hyperparameters = json.loads(conversation_row["hyperparameters"])
-    
-    # Get conversation history
-    cursor.execute("SELECT role, content FROM conversation_history WHERE conversation_id = ? ORDER BY id", (conversation_id,))
-    history_rows = cursor.fetchall()
+    Returns:
+        The conversation row, or None if the conversation does not exist
+    """
+    return get_db_connection().execute(
+        "SELECT provider, model, system_prompt, json_extract(hyperparameters, '$.temperature'), "
+        "json_extract(hyperparameters, '$.max_tokens'), json_extract(hyperparameters, '$.top_p'), "
+        "(SELECT json_group_array(value) FROM json_each(conversations.history) "
+        "WHERE key >= json_array_length(conversations.history) - ?) "
+        "FROM conversations WHERE id = ? AND last_active >= ?",
+        (history_limit, conversation_id, _expiry_cutoff())
+    ).fetchone()
+
+async def _run_turn(conversation_id: str, user_prompt: str, max_history: int) -> Dict[str, Any]:
+    """
+    Runs one conversation turn; the caller must hold the conversation's lock.
+
+    Nothing is written to the database until the provider has responded, and the turn's
+    writes are then committed together by the writer thread.
+    """
+    # Leave room in the history window for the new message
+    conversation_row = await _adb(_read_turn_context, conversation_id, max_history - 1)
     
-    conversation_history = [{"role": row["role"], "content": row["content"]} for row in history_rows]
+    if conversation_row is None:
+        return {"isError": True, "error": f"Conversation with ID '{conversation_id}' not found."}
+
+    # Get conversation data (positional unpacking avoids per-field name lookups on the row)
+    provider_name, model, system_prompt, temperature, max_tokens, top_p, history_json = conversation_row
+    conversation_history = orjson.loads(history_json)
     
-    # Add new user message to history
-    cursor.execute(
-        "INSERT INTO conversation_history (conversation_id, role, content) VALUES (?, ?, ?)",
-        (conversation_id, "user", user_prompt)
-    )
+    # The window must open on a user turn
+    while conversation_history and conversation_history[0]["role"] != "user":
+        conversation_history.pop(0)
     
-    # Update conversation history for provider
+    # Add new user message to history for the provider
     conversation_history.append({"role": "user", "content": user_prompt})
 
     try:
-        provider_class = PROVIDERS[provider_name]
-        provider_instance = provider_class()
+        provider_instance = get_provider(provider_name)
 
-        # Extract only the valid hyperparameters to prevent errors
-        valid_hyperparameters = {}
-        valid_params = ["temperature", "max_tokens", "top_p"]
-        for param in valid_params:
-            if param in hyperparameters and hyperparameters[param] is not None:
-                valid_hyperparameters[param] = hyperparameters[param]
+        # Pass only the hyperparameters that were set, to prevent errors
+        valid_hyperparameters = {
+            param: value
+            for param, value in (("temperature", temperature), ("max_tokens", max_tokens), ("top_p", top_p))
+            if value is not None
+        }
 
         # Use the generate_with_history method with only valid parameters
         result = await provider_instance.generate_with_history(
@@ -292,163 +538,189 @@ async def _continue_conversation(arguments: dict) -> types.TextContent:
             **valid_hyperparameters
         )
 
-        # Add assistant response to history
-        cursor.execute(
-            "INSERT INTO conversation_history (conversation_id, role, content) VALUES (?, ?, ?)",
-            (conversation_id, "assistant", result["text"])
-        )
-        
-        # Update usage, costs, and response time
-        usage_json = json.dumps(result.get("usage", {}))
-        costs_json = json.dumps(result.get("costs", {}))
+        usage_json = orjson.dumps(result.get("usage", {})).decode()
+        costs_json = orjson.dumps(result.get("costs", {})).decode()
         response_time = result.get("response_time", 0)
         
-        cursor.execute(
-            "UPDATE conversations SET usage = ?, costs = ?, response_time = ? WHERE id = ?",
-            (usage_json, costs_json, response_time, conversation_id)
-        )
-        
-        conn.commit()
-
-        return types.TextContent(
-            type="text",
-            text=json.dumps({
-                "isError": False,
-                "conversation_id": conversation_id,
-                "response": result["text"],
-                "model": result["model"],
-                "usage": result.get("usage", {}),
-                "costs": result.get("costs", {}),
-                "response_time": response_time
-            })
-        )
+        # Persist the turn in a single transaction. The conversation may have been closed or
+        # pruned to make room for a new one while the provider was generating.
+        if not await _WRITER.submit(
+            _record_turn, conversation_id, user_prompt, result["text"], usage_json, costs_json, response_time
+        ):
+            return {"isError": True, "error": f"Conversation with ID '{conversation_id}' not found."}
+
+        return {
+            "isError": False,
+            "conversation_id": conversation_id,
+            "response": result["text"],
+            "model": result["model"],
+            "usage": result.get("usage", {}),
+            "costs": result.get("costs", {}),
+            "response_time": response_time
+        }
 
     except ProviderError as e:
-        conn.rollback()
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": f"Provider error: {str(e)}"}))
+        return {"isError": True, "error": f"Provider error: {str(e)}"}
     except Exception as e:
-        conn.rollback()
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": f"Unexpected error during continuation: {str(e)}"}))
+        return {"isError": True, "error": f"Unexpected error during continuation: {str(e)}"}
+
+def _max_history(arguments: dict) -> Optional[int]:
+    """Get the requested history window, or None if it is not a positive integer."""
+    max_history = arguments.get("max_history", _MAX_HISTORY_MESSAGES)
+    # bool is a subclass of int, but True/False are not meaningful window sizes
+    if not isinstance(max_history, int) or isinstance(max_history, bool) or max_history < 1:
+        return None
+    return max_history
 
+@_json_errors
+async def _continue_conversation(arguments: dict) -> types.TextContent:
+    """Continues an existing conversation."""
+    # IMPORTANT: We ignore any system_prompt passed in the continuation request
+    if "system_prompt" in arguments:
+        logger.debug("system_prompt parameter ignored in conversation continuation.")
+
+    max_history = _max_history(arguments)
+    if max_history is None:
+        return _ERR_INVALID_MAX_HISTORY
+
+    return _tc(await _continue_one(
+        arguments["conversation_id"],
+        arguments.get("user_prompt", ""),
+        max_history
+    ))
+
+@_json_errors
+async def _continue_many(arguments: dict) -> types.TextContent:
+    """Continues several conversations concurrently."""
+    continuations = arguments["continuations"]
+    if not isinstance(continuations, list) or not all(
+        isinstance(item, dict) and item.get("conversation_id") for item in continuations
+    ):
+        return _ERR_INVALID_CONTINUATIONS
+    if not 1 <= len(continuations) <= _MAX_CONTINUATIONS:
+        return _ERR_TOO_MANY_CONTINUATIONS
+
+    max_history = _max_history(arguments)
+    if max_history is None:
+        return _ERR_INVALID_MAX_HISTORY
+
+    # Provider round trips for independent conversations overlap instead of running back to back
+    results = await asyncio.gather(
+        *(
+            _continue_one(item["conversation_id"], item.get("user_prompt", ""), max_history)
+            for item in continuations
+        ),
+        return_exceptions=True
+    )
+
+    return _tc({
+        "isError": False,
+        "results": [
+            {"isError": True, "error": f"Unexpected error during continuation: {str(result)}"}
+            if isinstance(result, BaseException) else result
+            for result in results
+        ]
+    })
+
+def _read_conversation(conversation_id: str) -> Optional[sqlite3.Row]:
+    """
+    Load the fields of a conversation returned by 'get', including its full history.
+
+    The history is stored as a JSON array and is emitted as-is, so messages are never
+    materialized as Python objects just to be encoded again.
+
+    Returns:
+        The conversation row, or None if the conversation does not exist or has expired
+    """
+    return get_db_connection().execute(
+        "SELECT response_time, provider, model, system_prompt, usage, costs, hyperparameters, history "
+        "FROM conversations WHERE id = ? AND last_active >= ?",
+        (conversation_id, _expiry_cutoff())
+    ).fetchone()
+
+@_json_errors
 async def _get_conversation(arguments: dict) -> types.TextContent:
     """Retrieves conversation history."""
-    conversation_id = arguments.get("conversation_id")
-
-    if not conversation_id:
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": "Missing required parameter 'conversation_id'."}))
+    conversation_id = arguments["conversation_id"]
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get conversation data
-    cursor.execute("SELECT * FROM conversations WHERE id = ?", (conversation_id,))
-    conversation_row = cursor.fetchone()
-    
-    if not conversation_row:
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": f"Conversation with ID '{conversation_id}' not found."}))
-    
-    # Get conversation history
-    cursor.execute("SELECT role, content FROM conversation_history WHERE conversation_id = ? ORDER BY id", (conversation_id,))
-    history_rows = cursor.fetchall()
-    
-    conversation_history = [{"role": row["role"], "content": row["content"]} for row in history_rows]
+    conversation_row = await _adb(_read_conversation, conversation_id)
     
-    # Parse JSON fields
-    usage = json.loads(conversation_row["usage"] or "{}")
-    costs = json.loads(conversation_row["costs"] or "{}")
-    hyperparameters = json.loads(conversation_row["hyperparameters"])
+    if conversation_row is None:
+        return _error(f"Conversation with ID '{conversation_id}' not found.")
+    response_time, provider, model, system_prompt, usage, costs, hyperparameters, history = conversation_row
     
-    return types.TextContent(
-        type="text",
-        text=json.dumps({
+    # The stored JSON fields are emitted as-is as well
+    return _tc_raw(
+        {
             "isError": False,
             "conversation_id": conversation_id,
-            "history": conversation_history,
-            "usage": usage,
-            "costs": costs,
-            "response_time": conversation_row["response_time"],
-            "provider": conversation_row["provider"],
-            "model": conversation_row["model"],
-            "system_prompt": conversation_row["system_prompt"],
-            "hyperparameters": hyperparameters
-        })
+            "response_time": response_time,
+            "provider": provider,
+            "model": model,
+            "system_prompt": system_prompt,
+        },
+        {
+            "history": history,
+            "usage": usage or "{}",
+            "costs": costs or "{}",
+            "hyperparameters": hyperparameters,
+        }
     )
 
+def _read_summaries() -> sqlite3.Row:
+    """
+    Load the number of unexpired conversations and their list summaries as a JSON object
+    keyed by conversation ID.
+
+    The object is built inside SQLite and emitted as-is, so no per-conversation Python
+    objects are created. Expired conversations are only filtered out here; they are deleted
+    when the next conversation is started.
+    """
+    # The summary fields are kept up to date on every write
+    return get_db_connection().execute(
+        "SELECT count(*), json_group_object(id, json_object("
+        "'provider', provider, 'model', model, 'first_user_message', first_user_message, "
+        "'latest_assistant_message', latest_assistant_message, 'message_count', message_count, "
+        "'system_prompt', system_prompt_summary)) "
+        "FROM conversations WHERE last_active >= ?",
+        (_expiry_cutoff(),)
+    ).fetchone()
+
+@_json_errors
 async def _list_conversations(arguments: dict) -> types.TextContent:
     """Lists all active conversations."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get all conversations
-    cursor.execute("SELECT id, provider, model, system_prompt FROM conversations")
-    conversation_rows = cursor.fetchall()
-    
-    conversation_summaries = {}
-    
-    for row in conversation_rows:
-        conversation_id = row["id"]
-        
-        # Get first user message and last assistant message
-        first_user_query = """
-            SELECT content FROM conversation_history 
-            WHERE conversation_id = ? AND role = 'user' 
-            ORDER BY id ASC LIMIT 1
-        """
-        last_assistant_query = """
-            SELECT content FROM conversation_history 
-            WHERE conversation_id = ? AND role = 'assistant' 
-            ORDER BY id DESC LIMIT 1
-        """
-        
-        cursor.execute(first_user_query, (conversation_id,))
-        first_user_row = cursor.fetchone()
-        first_user_message = first_user_row["content"] if first_user_row else ""
-        
-        cursor.execute(last_assistant_query, (conversation_id,))
-        last_assistant_row = cursor.fetchone()
-        last_assistant_message = last_assistant_row["content"] if last_assistant_row else ""
-        
-        # Count messages
-        cursor.execute("SELECT COUNT(*) as count FROM conversation_history WHERE conversation_id = ?", (conversation_id,))
-        message_count = cursor.fetchone()["count"]
-        
-        # Create summary
-        system_prompt = row["system_prompt"]
-        conversation_summaries[conversation_id] = {
-            "provider": row["provider"],
-            "model": row["model"],
-            "first_user_message": first_user_message,
-            "latest_assistant_message": last_assistant_message,
-            "message_count": message_count,
-            "system_prompt": system_prompt[:100] + "..." if len(system_prompt) > 100 else system_prompt
-        }
+    conversation_count, conversation_summaries = await _adb(_read_summaries)
     
-    return types.TextContent(
-        type="text",
-        text=json.dumps({
-            "isError": False,
-            "conversation_count": len(conversation_summaries),
-            "conversations": conversation_summaries
-        })
+    return _tc_raw(
+        {"isError": False, "conversation_count": conversation_count},
+        {"conversations": conversation_summaries}
     )
 
+@_json_errors
 async def _close_conversation(arguments: dict) -> types.TextContent:
     """Closes a conversation."""
-    conversation_id = arguments.get("conversation_id")
+    conversation_id = arguments["conversation_id"]
 
-    if not conversation_id:
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": "Missing required parameter 'conversation_id'."}))
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if conversation exists
-    cursor.execute("SELECT 1 FROM conversations WHERE id = ?", (conversation_id,))
-    if not cursor.fetchone():
-        return types.TextContent(type="text", text=json.dumps({"isError": True, "error": f"Conversation with ID '{conversation_id}' not found."}))
-    
-    # Delete conversation (will cascade to history)
-    cursor.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
-    conn.commit()
+    # Delete conversation (its history is stored on the same row); no returned row means it did not exist
+    if not await _WRITER.submit(_delete_conversation, conversation_id):
+        return _error(f"Conversation with ID '{conversation_id}' not found.")
     
-    return types.TextContent(type="text", text=json.dumps({"isError": False, "message": f"Conversation '{conversation_id}' closed."})) 
\ No newline at end of file
+    return _tc({"isError": False, "message": f"Conversation '{conversation_id}' closed."})
+
+
+# Dispatch table: mode -> (handler, parameters that must be present and non-empty)
+_MODES = {
+    "start": (_start_conversation, ("provider", "model", "system_prompt")),
+    "continue": (_continue_conversation, ("conversation_id",)),
+    "continue_many": (_continue_many, ("continuations",)),
+    "get": (_get_conversation, ("conversation_id",)),
+    "list": (_list_conversations, ()),
+    "close": (_close_conversation, ("conversation_id",)),
+}
+
+# Precomputed "missing parameter" errors for every (mode, parameter) pair in _MODES
+_ERR_MISSING_PARAM = {
+    (mode, param): _error(f"Missing required parameter '{param}' for '{mode}' mode.")
+    for mode, (_, required) in _MODES.items()
+    for param in required
+}
@@ -0,0 +1,65 @@
+"""Tests for the single-threaded database writer."""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from mcp_prompt_tester.db_writer import DBWriter
+
+
+def _insert(cursor: sqlite3.Cursor, value: int) -> int:
+    cursor.execute("INSERT INTO t (x) VALUES (?)", (value,))
+    return value
+
+
+class DBWriterTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "writer.db")
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE t (x INTEGER PRIMARY KEY)")
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    async def test_failing_item_only_rolls_back_itself(self):
+        writer = DBWriter(self._connect)
+        try:
+            results = await asyncio.gather(
+                writer.submit(_insert, 1), writer.submit(_insert, 1), writer.submit(_insert, 2),
+                return_exceptions=True
+            )
+        finally:
+            writer.close()
+
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], sqlite3.IntegrityError)
+        self.assertEqual(results[2], 2)
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(conn.execute("SELECT x FROM t ORDER BY x").fetchall(), [(1,), (2,)])
+        conn.close()
+
+    async def test_connect_failure_fails_submissions_and_retries(self):
+        attempts = []
+
+        def connect() -> sqlite3.Connection:
+            attempts.append(None)
+            if len(attempts) == 1:
+                raise sqlite3.OperationalError("unable to open database file")
+            return self._connect()
+
+        writer = DBWriter(connect)
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                await asyncio.wait_for(writer.submit(_insert, 1), timeout=5)
+            # The next submission starts a new writer, which opens the database this time
+            self.assertEqual(await asyncio.wait_for(writer.submit(_insert, 1), timeout=5), 1)
+        finally:
+            writer.close()
+        self.assertEqual(len(attempts), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,241 @@
+"""Tests for multi-turn conversation storage: schema migration, history window and retention."""
+
+import asyncio
+import concurrent.futures
+import importlib
+import os
+import sqlite3
+import tempfile
+import unittest
+from typing import Any, Dict, List
+from unittest import mock
+
+import orjson
+
+from mcp_prompt_tester.providers import PROVIDERS, ProviderBase, _INSTANCES
+
+# The tools package re-exports the handler function under the module's own name
+conversations = importlib.import_module("mcp_prompt_tester.tools.test_multiturn_conversation")
+
+# Schema written by releases that stored one history row per message
+_BASELINE_SCHEMA = """
+CREATE TABLE conversations (
+    id TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    system_prompt TEXT NOT NULL,
+    hyperparameters TEXT NOT NULL,
+    usage TEXT,
+    costs TEXT,
+    response_time REAL DEFAULT 0
+);
+CREATE TABLE conversation_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
+);
+"""
+
+
+class FakeProvider(ProviderBase):
+    """Provider that answers locally and records the history it was sent."""
+
+    histories: List[List[Dict[str, str]]] = []
+    delay = 0.0
+
+    async def generate(self, model, system_prompt, user_prompt, **kwargs) -> Dict[str, Any]:
+        return {"text": f"echo:{user_prompt}", "model": model, "usage": {}, "costs": {}, "response_time": 0}
+
+    async def generate_with_history(self, model, system_prompt, message_history, **kwargs) -> Dict[str, Any]:
+        FakeProvider.histories.append(list(message_history))
+        await asyncio.sleep(FakeProvider.delay)
+        return {
+            "text": f"reply:{message_history[-1]['content']}", "model": model,
+            "usage": {}, "costs": {}, "response_time": 0
+        }
+
+    @classmethod
+    def get_default_models(cls) -> Dict[str, Dict[str, Any]]:
+        return {}
+
+
+class MultiturnConversationTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "conversations.db")
+        env = mock.patch.dict(os.environ, {"PROMPT_TESTER_DB_PATH": self.path, "FAKE_API_KEY": "test"})
+        env.start()
+        self.addCleanup(env.stop)
+        # The provider instance cache is restored as well, dropping the instance created here
+        for patcher in (mock.patch.dict(PROVIDERS, {"fake": FakeProvider}), mock.patch.dict(_INSTANCES)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(conversations._API_KEY_OK.pop, "fake", None)
+        FakeProvider.histories = []
+        FakeProvider.delay = 0.0
+        self._reset_storage()
+        self.addCleanup(self._reset_storage)
+
+    def _reset_storage(self):
+        """Drop every open connection so the next call opens (and initializes) self.path."""
+        conversations._WRITER.close()
+        conversations._close_read_connections()
+        conversations._DB_POOL = concurrent.futures.ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="db-read"
+        )
+        conversations._DB_READY = False
+
+    async def _call(self, **arguments) -> Dict[str, Any]:
+        return orjson.loads((await conversations.test_multiturn_conversation(arguments)).text)
+
+    async def _start(self, user_prompt: str) -> str:
+        result = await self._call(
+            mode="start", provider="fake", model="m", system_prompt="sys", user_prompt=user_prompt
+        )
+        self.assertFalse(result["isError"], result)
+        return result["conversation_id"]
+
+    def _execute(self, sql: str, *params: Any) -> List[tuple]:
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    async def test_migrates_baseline_schema(self):
+        conn = sqlite3.connect(self.path)
+        conn.executescript(_BASELINE_SCHEMA)
+        conn.executemany(
+            "INSERT INTO conversations VALUES (?, 'fake', 'm', 'sys', ?, '{}', '{}', 0)",
+            [("old", '{"temperature": 0.5}'), ("empty", "{}")]
+        )
+        # Interleaved with another conversation, so history order must come from the row ids
+        conn.executemany(
+            "INSERT INTO conversation_history (conversation_id, role, content) VALUES (?, ?, ?)",
+            [("old", "user", "hello"), ("other", "user", "x"), ("old", "assistant", "hi")]
+        )
+        conn.commit()
+        conn.close()
+
+        listing = await self._call(mode="list")
+        self.assertEqual(listing["conversation_count"], 2)
+        self.assertEqual(listing["conversations"]["old"], {
+            "provider": "fake", "model": "m", "first_user_message": "hello",
+            "latest_assistant_message": "hi", "message_count": 2, "system_prompt": "sys"
+        })
+        self.assertEqual(listing["conversations"]["empty"]["message_count"], 0)
+
+        old = await self._call(mode="get", conversation_id="old")
+        self.assertEqual(old["history"], [
+            {"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi"}
+        ])
+        self.assertEqual(old["hyperparameters"], {"temperature": 0.5})
+        empty = await self._call(mode="get", conversation_id="empty")
+        self.assertEqual(empty["history"], [])
+
+        tables = self._execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        self.assertNotIn(("conversation_history",), tables)
+
+        # Migrated conversations continue with their earlier turns
+        result = await self._call(mode="continue", conversation_id="old", user_prompt="again")
+        self.assertFalse(result["isError"], result)
+        self.assertEqual([m["content"] for m in FakeProvider.histories[-1]], ["hello", "hi", "again"])
+        result = await self._call(mode="continue", conversation_id="empty", user_prompt="first")
+        self.assertFalse(result["isError"], result)
+        self.assertEqual(FakeProvider.histories[-1], [{"role": "user", "content": "first"}])
+
+    async def test_history_window_sent_to_provider(self):
+        conversation_id = await self._start("u0")
+        for i in range(1, 4):
+            result = await self._call(
+                mode="continue", conversation_id=conversation_id, user_prompt=f"u{i}", max_history=4
+            )
+            self.assertFalse(result["isError"], result)
+
+        # The window holds at most max_history messages and always opens on a user turn
+        self.assertEqual(
+            [[m["content"] for m in history] for history in FakeProvider.histories],
+            [["u0", "echo:u0", "u1"], ["u1", "reply:u1", "u2"], ["u2", "reply:u2", "u3"]]
+        )
+        # The stored history is not truncated
+        stored = await self._call(mode="get", conversation_id=conversation_id)
+        self.assertEqual(len(stored["history"]), 8)
+
+        for max_history in (0, "3", None, True):
+            result = await self._call(
+                mode="continue", conversation_id=conversation_id, user_prompt="x", max_history=max_history
+            )
+            self.assertEqual(result["error"], "The 'max_history' parameter must be a positive integer.")
+
+    async def test_continue_many(self):
+        first, second = await self._start("a"), await self._start("b")
+
+        result = await self._call(mode="continue_many", continuations=[
+            {"conversation_id": first, "user_prompt": "a2"},
+            {"conversation_id": "missing", "user_prompt": "x"},
+            {"conversation_id": second, "user_prompt": "b2"},
+        ])
+        self.assertFalse(result["isError"], result)
+        self.assertEqual(
+            [(r["isError"], r.get("response")) for r in result["results"]],
+            [(False, "reply:a2"), (True, None), (False, "reply:b2")]
+        )
+        self.assertEqual(result["results"][1]["error"], "Conversation with ID 'missing' not found.")
+
+        result = await self._call(mode="continue_many", continuations=[{"conversation_id": first}] * 5)
+        self.assertTrue(result["isError"])
+
+    async def test_conversation_limit(self):
+        with mock.patch.dict(os.environ, {"PROMPT_TESTER_MAX_CONVERSATIONS": "2"}):
+            ids = [await self._start("p0"), await self._start("p1")]
+            # last_active has one-second resolution, so age the earlier conversations explicitly
+            self._execute("UPDATE conversations SET last_active = last_active - 20 WHERE id = ?", ids[0])
+            self._execute("UPDATE conversations SET last_active = last_active - 10 WHERE id = ?", ids[1])
+            ids.append(await self._start("p2"))
+
+            listing = await self._call(mode="list")
+            self.assertEqual(sorted(listing["conversations"]), sorted(ids[1:]))
+
+        with mock.patch.dict(os.environ, {"PROMPT_TESTER_MAX_CONVERSATIONS": "0"}):
+            for i in range(3):
+                await self._start(f"q{i}")
+            self.assertEqual((await self._call(mode="list"))["conversation_count"], 5)
+
+    async def test_expired_conversations_are_hidden_then_deleted(self):
+        expired, active = await self._start("old"), await self._start("new")
+        self._execute("UPDATE conversations SET last_active = 1 WHERE id = ?", expired)
+
+        listing = await self._call(mode="list")
+        self.assertEqual(list(listing["conversations"]), [active])
+        self.assertTrue((await self._call(mode="get", conversation_id=expired))["isError"])
+        result = await self._call(mode="continue", conversation_id=expired, user_prompt="x")
+        self.assertTrue(result["isError"])
+        # Listing does not write; the expired row is removed when the next conversation starts
+        self.assertEqual(self._execute("SELECT count(*) FROM conversations"), [(2,)])
+        await self._start("another")
+        self.assertEqual(self._execute("SELECT count(*) FROM conversations WHERE id = ?", expired), [(0,)])
+
+        with mock.patch.dict(os.environ, {"PROMPT_TESTER_CONVERSATION_TTL": "0"}):
+            self._execute("UPDATE conversations SET last_active = 1 WHERE id = ?", active)
+            self.assertFalse((await self._call(mode="get", conversation_id=active))["isError"])
+
+    async def test_turn_fails_when_conversation_is_closed_during_generation(self):
+        conversation_id = await self._start("a")
+        FakeProvider.delay = 0.2
+
+        turn = asyncio.create_task(
+            self._call(mode="continue", conversation_id=conversation_id, user_prompt="b")
+        )
+        await asyncio.sleep(0.05)
+        self.assertFalse((await self._call(mode="close", conversation_id=conversation_id))["isError"])
+
+        result = await turn
+        self.assertEqual(result["error"], f"Conversation with ID '{conversation_id}' not found.")
+
+
+if __name__ == "__main__":
+    unittest.main()